@@ -1,20 +1,106 @@
 # app.py
+import io
+import os
+
 import streamlit as st
 import pandas as pd
 import numpy as np
+import polars as pl
+import pyarrow as pa
+import pyarrow.csv as pacsv
 import plotly.express as px
 from datetime import date, datetime
 
+# Optional SIMD downsampler for the price/demand scatter; fall back to
+# random sampling if unavailable
+try:
+    from tsdownsample import MinMaxLTTBDownsampler
+except ImportError:
+    MinMaxLTTBDownsampler = None
+
+# Optional Numba kernel that fuses the three membership gathers of the
+# sales filter into one parallel pass; falls back to chained NumPy gathers
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def fused_member_mask(region_codes, region_lut,
+                          store_codes, store_lut,
+                          cat_codes, cat_lut):
+        n = region_codes.shape[0]
+        out = np.empty(n, dtype=np.bool_)
+        for i in prange(n):
+            out[i] = (region_lut[region_codes[i]]
+                      and store_lut[store_codes[i]]
+                      and cat_lut[cat_codes[i]])
+        return out
+else:
+    fused_member_mask = None
+
 st.set_page_config(page_title="Lulu Executive Command Center", layout="wide")
 
+# Narrow dtypes for every sales column the dashboard actually uses; the
+# loader projects down to these, so unused columns never leave the CSV
+SALES_SCHEMA = {
+    "Date":             pl.Utf8,
+    "Region":           pl.Categorical,
+    "Store_ID":         pl.Categorical,
+    "SKU_Category":     pl.Categorical,
+    "SKU":              pl.Categorical,
+    "Promo_Flag":       pl.Int8,
+    "Sales_Revenue":    pl.Float32,
+    "Units_Sold":       pl.Int32,
+    "Basket_Size":      pl.Float32,
+    "Unit_Price":       pl.Float32,
+    "Footfall":         pl.Int32,
+    "Web_Orders":       pl.Int32,
+    "Mobile_Orders":    pl.Int32,
+    "Stock_On_Hand":    pl.Int32,
+    "Staff_Count":      pl.Int16,
+    "Discount":         pl.Float32,
+    "Competitor_Price": pl.Float32,
+}
+
 # -----------------------------
 # Data Loaders (with hardening)
 # -----------------------------
 @st.cache_data
 def load_data():
-    # Read CSVs without assuming correct types
-    sales = pd.read_csv("lulu_sales_ops.csv")
-    persona = pd.read_csv("lulu_persona.csv")
+    # Lazily scan with Polars, collect once, and hand pandas frames to the
+    # rest of the app. Parquet mirrors (see build_parquet.py) are preferred
+    # over the CSVs: columnar, compressed, no tokenization on cold start.
+    # The sales scan applies the narrow schema and projects away unused
+    # columns; intersect with the file's columns so a missing one can't
+    # break the scan (the loops below backfill it instead).
+    if os.path.exists("lulu_sales_ops.parquet"):
+        lf = pl.scan_parquet("lulu_sales_ops.parquet")
+        schema = lf.collect_schema()
+        present = set(schema.names())
+        overrides = {c: t for c, t in SALES_SCHEMA.items() if c in present}
+        # Categoricals (and the Date string) must be cast via Utf8 when the
+        # mirror inferred a numeric type, e.g. the all-digit SKU column
+        lf = lf.select(
+            (pl.col(c).cast(pl.Utf8) if t in (pl.Categorical, pl.Utf8) and schema[c] != pl.Utf8
+             else pl.col(c)).cast(t)
+            for c, t in overrides.items()
+        )
+    else:
+        present = set(pl.scan_csv("lulu_sales_ops.csv").collect_schema().names())
+        overrides = {c: t for c, t in SALES_SCHEMA.items() if c in present}
+        lf = pl.scan_csv("lulu_sales_ops.csv", schema_overrides=overrides).select(list(overrides))
+    sales = (
+        lf.with_columns(pl.col("Date").str.strptime(pl.Datetime("ns"), "%d/%m/%Y", strict=False)
+                        if "Date" in overrides else [])
+        .collect()
+        .to_pandas()
+    )
+    if os.path.exists("lulu_persona.parquet"):
+        persona = pl.scan_parquet("lulu_persona.parquet").collect().to_pandas()
+    else:
+        persona = pl.scan_csv("lulu_persona.csv").collect().to_pandas()
 
     # Coerce datetimes and sanitize columns
     if "Date" in sales.columns:
@@ -44,6 +130,20 @@ def load_data():
         if col not in persona.columns:
             persona[col] = np.nan
 
+    # Coerce the persona metrics behind Value_Index once at load instead of
+    # re-running to_numeric on every rerun of the Personas tab
+    for col in ["Avg_Spend_AED","Visit_Frequency","Typical_Basket_Size"]:
+        persona[col] = pd.to_numeric(persona[col], errors="coerce").fillna(0.0).astype("float32")
+
+    # Keep sales sorted by Date so the date-range filter can binary-search
+    # a contiguous slice instead of scanning the whole frame
+    sales = sales.sort_values("Date").reset_index(drop=True)
+
+    # Dict-encode the filterable string columns: smaller, and membership
+    # tests become integer-code lookups instead of string hashing
+    for col in ["Region","Store_ID","SKU_Category"]:
+        sales[col] = sales[col].astype("category")
+
     return sales, persona
 
 
@@ -56,6 +156,233 @@ if sales.empty or sales["Date"].dropna().empty:
     st.error("Sales dataset is empty or has invalid 'Date' values. Please verify lulu_sales_ops.csv.")
     st.stop()
 
+# -------------------------------------------------------
+# Cached filter & aggregates (keyed on the filter tuple)
+# -------------------------------------------------------
+# Each helper is a pure function of the filter signature
+# (start, end, regions, stores, categories), so Streamlit can
+# serve repeated widget interactions straight from cache instead
+# of recomputing every aggregate on each rerun.
+
+def safe_sum(s):   return float(s.sum()) if not s.empty else 0.0
+def safe_mean(s):  return float(s.mean()) if not s.empty else 0.0
+def safe_int(n):   return int(n) if not pd.isna(n) else 0
+
+def member_lut(categories_index, selected):
+    # Boolean LUT indexed by a categorical's integer codes. The trailing
+    # slot is what NaN codes (-1) land on; an empty selection means "no
+    # filter", matching the old behavior where the isin mask was skipped.
+    lut = np.ones(len(categories_index) + 1, dtype=bool)
+    if selected:
+        lut[:] = False
+        idx = categories_index.get_indexer(pd.Index(selected))
+        lut[idx[idx >= 0]] = True
+    return lut
+
+@st.cache_data(ttl=3600, max_entries=32)
+def filter_sales(start_d, end_d, regions, stores, cats):
+    # Sales is pre-sorted by Date, so the date range is a binary-searched
+    # slice; the categorical masks then only touch rows inside that slice
+    date_index = sales["Date"].to_numpy()
+    lo = date_index.searchsorted(pd.Timestamp(start_d).to_datetime64())
+    hi = date_index.searchsorted(pd.Timestamp(end_d).to_datetime64(), side="right")
+
+    # The mask is computed on zero-copy views of the code arrays; no
+    # intermediate sliced DataFrame is built
+    luts, codes = [], []
+    for col_name, selected in (("Region", regions),
+                               ("Store_ID", stores),
+                               ("SKU_Category", cats)):
+        col = sales[col_name]
+        luts.append(member_lut(col.cat.categories, selected))
+        codes.append(col.cat.codes.to_numpy()[lo:hi])
+
+    if fused_member_mask is not None:
+        # One parallel pass, one boolean output, no temporaries
+        mask = fused_member_mask(codes[0], luts[0], codes[1], luts[1], codes[2], luts[2])
+    else:
+        mask = luts[0][codes[0]] & luts[1][codes[1]] & luts[2][codes[2]]
+    # Arrow-style filter->take: resolve the mask to row positions and gather
+    # once from the parent frame, rather than slice-then-boolean-index
+    return sales.take(np.flatnonzero(mask) + lo)
+
+@st.cache_data(ttl=3600, max_entries=32)
+def compute_kpis(start_d, end_d, regions, stores, cats):
+    sales_f = filter_sales(start_d, end_d, regions, stores, cats)
+    kpis = {
+        "total_revenue": safe_sum(sales_f["Sales_Revenue"]),
+        "total_units":   safe_sum(sales_f["Units_Sold"]),
+        "avg_basket":    safe_mean(sales_f["Basket_Size"]),
+        "avg_price":     safe_mean(sales_f["Unit_Price"]),
+        "avg_footfall":  safe_mean(sales_f["Footfall"]),
+        "conv_proxy":    0.0,
+    }
+    denom = sales_f["Footfall"].sum()
+    if denom and denom > 0:
+        kpis["conv_proxy"] = (
+            (sales_f["Web_Orders"].sum() + sales_f["Mobile_Orders"].sum()) / denom
+        ) * 100.0
+    return kpis
+
+@st.cache_data(ttl=3600, max_entries=32)
+def daily_revenue(start_d, end_d, regions, stores, cats):
+    # The daily Date -> Revenue index behind the trend chart and its
+    # download; sort=False skips the group-key sort since the filtered
+    # frame is already in Date order
+    sales_f = filter_sales(start_d, end_d, regions, stores, cats)
+    return sales_f.groupby("Date", as_index=False, sort=False)["Sales_Revenue"].sum()
+
+@st.cache_data(ttl=3600, max_entries=32)
+def daily_revenue_csv_bytes(start_d, end_d, regions, stores, cats):
+    buf = io.BytesIO()
+    pacsv.write_csv(
+        pa.Table.from_pandas(daily_revenue(start_d, end_d, regions, stores, cats),
+                             preserve_index=False),
+        buf
+    )
+    return buf.getvalue()
+
+@st.cache_data(ttl=3600, max_entries=32)
+def category_summary(start_d, end_d, regions, stores, cats):
+    # One hash-groupby pass over SKU_Category feeds both the revenue-mix
+    # chart and the operational-drivers table instead of two full scans
+    sales_f = filter_sales(start_d, end_d, regions, stores, cats)
+    return sales_f.groupby("SKU_Category", as_index=False, observed=True).agg(
+        Sales_Revenue=("Sales_Revenue","sum"),
+        Avg_Footfall=("Footfall","mean"),
+        Avg_Staff=("Staff_Count","mean"),
+        Avg_Discount=("Discount","mean"),
+        Avg_CompetitorPrice=("Competitor_Price","mean")
+    )
+
+def cat_mix(start_d, end_d, regions, stores, cats):
+    summary = category_summary(start_d, end_d, regions, stores, cats)
+    return (
+        summary[["SKU_Category","Sales_Revenue"]]
+        .sort_values("Sales_Revenue", ascending=False)
+    )
+
+@st.cache_data(ttl=3600, max_entries=32)
+def store_perf(start_d, end_d, regions, stores, cats):
+    sales_f = filter_sales(start_d, end_d, regions, stores, cats)
+    return (
+        sales_f.groupby(["Region","Store_ID"], as_index=False, observed=True)
+        .agg(Revenue=("Sales_Revenue","sum"),
+             Units=("Units_Sold","sum"),
+             Footfall=("Footfall","sum"))
+        .sort_values("Revenue", ascending=False)
+    )
+
+@st.cache_data(ttl=3600, max_entries=32)
+def promo_impact(start_d, end_d, regions, stores, cats):
+    sales_f = filter_sales(start_d, end_d, regions, stores, cats)
+    promo = sales_f.groupby("Promo_Flag", as_index=False)["Sales_Revenue"].mean()
+    promo["Promo_Flag"] = promo["Promo_Flag"].map({0:"No Promo", 1:"Promo"}).fillna("Unknown")
+    return promo
+
+def category_drivers(start_d, end_d, regions, stores, cats):
+    summary = category_summary(start_d, end_d, regions, stores, cats)
+    return summary[["SKU_Category","Avg_Footfall","Avg_Staff",
+                    "Avg_Discount","Avg_CompetitorPrice"]].round(2)
+
+@st.cache_data(ttl=3600, max_entries=32)
+def price_units_sample(start_d, end_d, regions, stores, cats, n_out=400, cap=2000):
+    # MinMaxLTTB keeps the visual envelope of each category's price/demand
+    # cloud, unlike a random sample which destroys shape structure
+    sales_f = filter_sales(start_d, end_d, regions, stores, cats)
+    if sales_f.empty or MinMaxLTTBDownsampler is None:
+        return sales_f.sample(min(cap, len(sales_f)))
+    kept = []
+    for _, grp in sales_f.groupby("SKU_Category", observed=True):
+        grp = grp.sort_values("Unit_Price")
+        if len(grp) <= n_out:
+            kept.append(grp)
+        else:
+            idx = MinMaxLTTBDownsampler().downsample(
+                grp["Unit_Price"].to_numpy(), grp["Units_Sold"].to_numpy(dtype="float64"),
+                n_out=n_out
+            )
+            kept.append(grp.iloc[idx])
+    out = pd.concat(kept)
+    return out.sample(cap) if len(out) > cap else out
+
+@st.cache_data(ttl=3600, max_entries=32)
+def price_units_trend(start_d, end_d, regions, stores, cats):
+    # One least-squares line per category, fit once on the full filtered
+    # data instead of letting statsmodels refit inside Plotly per render
+    sales_f = filter_sales(start_d, end_d, regions, stores, cats)
+    lines = {}
+    for cat_name, grp in sales_f.groupby("SKU_Category", observed=True):
+        x = grp["Unit_Price"].to_numpy(dtype="float64")
+        y = grp["Units_Sold"].to_numpy(dtype="float64")
+        if x.size < 2 or np.ptp(x) == 0:
+            continue
+        slope, intercept = np.polyfit(x, y, 1)
+        lines[cat_name] = (float(slope), float(intercept), float(x.min()), float(x.max()))
+    return lines
+
+@st.cache_data(ttl=3600, max_entries=32)
+def revenue_q25(start_d, end_d, regions, stores, cats):
+    # O(N) introselect for the 25th-percentile pivot; Series.quantile
+    # sorts the whole column just to pick one order statistic
+    sales_f = filter_sales(start_d, end_d, regions, stores, cats)
+    arr = sales_f["Sales_Revenue"].to_numpy()
+    if arr.size == 0:
+        return 0.0
+    k = int(0.25 * (arr.size - 1))
+    return float(np.partition(arr, k)[k])
+
+@st.cache_data(ttl=3600, max_entries=32)
+def sales_csv_bytes(start_d, end_d, regions, stores, cats):
+    # Arrow's C++ CSV writer instead of pandas' per-cell Python formatter,
+    # cached so reruns with unchanged filters never re-serialize
+    sales_f = filter_sales(start_d, end_d, regions, stores, cats)
+    buf = io.BytesIO()
+    pacsv.write_csv(pa.Table.from_pandas(sales_f, preserve_index=False), buf)
+    return buf.getvalue()
+
+@st.cache_data(ttl=3600, max_entries=32)
+def persona_bin_counts(loyalty, x, color):
+    # Server-side binning: the browser receives O(bins x colors) bars
+    # instead of every raw persona row for Plotly to re-bin client-side
+    persona_f = persona
+    if loyalty:
+        persona_f = persona[persona["Loyalty_Segment"].isin(list(loyalty))]
+    return persona_f.groupby([x, color], observed=True).size().reset_index(name="Count")
+
+@st.cache_data(ttl=3600, max_entries=32)
+def persona_csv_bytes(loyalty):
+    persona_f = persona
+    if loyalty:
+        persona_f = persona[persona["Loyalty_Segment"].isin(list(loyalty))]
+    buf = io.BytesIO()
+    pacsv.write_csv(pa.Table.from_pandas(persona_f, preserve_index=False), buf)
+    return buf.getvalue()
+
+@st.cache_data(ttl=3600, max_entries=32)
+def compute_alerts(start_d, end_d, regions, stores, cats):
+    # One pass over the raw arrays instead of three full-length boolean
+    # Series and three pandas fancy-index round-trips
+    sales_f = filter_sales(start_d, end_d, regions, stores, cats)
+    if sales_f.empty:
+        empty = pd.DataFrame()
+        return empty, empty, empty
+
+    sr = sales_f["Sales_Revenue"].to_numpy()
+    sh = sales_f["Stock_On_Hand"].to_numpy()
+    us = sales_f["Units_Sold"].to_numpy()
+    pf = sales_f["Promo_Flag"].to_numpy()
+    ff = sales_f["Footfall"].to_numpy()
+    sc = sales_f["Staff_Count"].to_numpy()
+    q25 = revenue_q25(start_d, end_d, regions, stores, cats)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        restock_m  = sh < us * 0.6
+        promo_m    = (pf == 0) & (sr < q25)
+        staffing_m = (ff / sc) > 50
+
+    return sales_f.loc[restock_m], sales_f.loc[promo_m], sales_f.loc[staffing_m]
+
 # ---------------------------------
 # Sidebar: Global Filters (hardened)
 # ---------------------------------
@@ -102,19 +429,10 @@ with st.sidebar:
 # -----------------------------
 # Apply Filters (null-safe)
 # -----------------------------
-mask = (
-    (sales["Date"] >= pd.to_datetime(start_d)) &
-    (sales["Date"] <= pd.to_datetime(end_d))
-)
-if region:
-    mask &= sales["Region"].isin(region)
-if stores:
-    mask &= sales["Store_ID"].isin(stores)
-if categories:
-    mask &= sales["SKU_Category"].isin(categories)
-
-sales_f = sales.loc[mask].copy()
-persona_f = persona.copy()
+# Tuples (not lists) so Streamlit can hash the signature for caching
+filter_sig = (start_d, end_d, tuple(region), tuple(stores), tuple(categories))
+sales_f = filter_sales(*filter_sig)
+persona_f = persona
 if loyalty_filter:
     persona_f = persona_f[persona_f["Loyalty_Segment"].isin(loyalty_filter)]
 
@@ -123,35 +441,31 @@ if loyalty_filter:
 # -----------------------------
 st.subheader("📈 Executive KPIs")
 
-def safe_sum(s):   return float(s.sum()) if not s.empty else 0.0
-def safe_mean(s):  return float(s.mean()) if not s.empty else 0.0
-def safe_int(n):   return int(n) if not pd.isna(n) else 0
-
-total_revenue = safe_sum(sales_f["Sales_Revenue"])
-total_units   = safe_sum(sales_f["Units_Sold"])
-avg_basket    = safe_mean(sales_f["Basket_Size"])
-avg_price     = safe_mean(sales_f["Unit_Price"])
-avg_footfall  = safe_mean(sales_f["Footfall"])
-conv_proxy    = 0.0
-denom = sales_f["Footfall"].sum()
-if denom and denom > 0:
-    conv_proxy = ((sales_f["Web_Orders"].sum() + sales_f["Mobile_Orders"].sum()) / denom) * 100.0
+kpis = compute_kpis(*filter_sig)
 
 c1, c2, c3, c4, c5, c6 = st.columns(6)
-c1.metric("Total Revenue (AED)", f"{total_revenue:,.0f}")
-c2.metric("Total Units Sold", f"{safe_int(total_units):,}")
-c3.metric("Avg Basket Size", f"{avg_basket:,.2f}")
-c4.metric("Avg Unit Price (AED)", f"{avg_price:,.2f}")
-c5.metric("Avg Footfall / Day", f"{avg_footfall:,.0f}")
-c6.metric("Digital Conversion Proxy (%)", f"{conv_proxy:,.2f}")
+c1.metric("Total Revenue (AED)", f"{kpis['total_revenue']:,.0f}")
+c2.metric("Total Units Sold", f"{safe_int(kpis['total_units']):,}")
+c3.metric("Avg Basket Size", f"{kpis['avg_basket']:,.2f}")
+c4.metric("Avg Unit Price (AED)", f"{kpis['avg_price']:,.2f}")
+c5.metric("Avg Footfall / Day", f"{kpis['avg_footfall']:,.0f}")
+c6.metric("Digital Conversion Proxy (%)", f"{kpis['conv_proxy']:,.2f}")
 
 # ----------------------------------------
 # Tabs: Overview | Sales Ops | Personas | Alerts
 # ----------------------------------------
-tab1, tab2, tab3, tab4 = st.tabs(["Overview", "Sales Ops", "Personas", "Alerts & Actions"])
+# st.tabs executes every tab body on each rerun even though only one is
+# visible; a radio-driven section renders (and computes) only the active one
+SECTIONS = ["Overview", "Sales Ops", "Personas", "Alerts & Actions"]
+active_tab = st.radio(
+    "Section", SECTIONS,
+    horizontal=True,
+    key="active_tab",
+    label_visibility="collapsed"
+)
 
 # ------------- Overview -------------
-with tab1:
+if active_tab == "Overview":
     st.markdown("### Revenue Trend & Category Mix")
     col_l, col_r = st.columns([2, 1])
 
@@ -159,9 +473,9 @@ with tab1:
         if sales_f.empty:
             st.info("No data for the selected filters.")
         else:
-            rev_trend = sales_f.groupby("Date", as_index=False)["Sales_Revenue"].sum()
+            trend = daily_revenue(*filter_sig)
             st.plotly_chart(
-                px.line(rev_trend, x="Date", y="Sales_Revenue", title="Revenue Over Time"),
+                px.line(trend, x="Date", y="Sales_Revenue", title="Revenue Over Time"),
                 use_container_width=True
             )
 
@@ -169,13 +483,9 @@ with tab1:
         if sales_f.empty:
             st.empty()
         else:
-            cat_mix = (
-                sales_f.groupby("SKU_Category", as_index=False)["Sales_Revenue"]
-                .sum()
-                .sort_values("Sales_Revenue", ascending=False)
-            )
+            mix = cat_mix(*filter_sig)
             st.plotly_chart(
-                px.bar(cat_mix, x="SKU_Category", y="Sales_Revenue", title="Category Revenue Mix"),
+                px.bar(mix, x="SKU_Category", y="Sales_Revenue", title="Category Revenue Mix"),
                 use_container_width=True
             )
 
@@ -183,17 +493,11 @@ with tab1:
     if sales_f.empty:
         st.info("No data for the selected filters.")
     else:
-        perf = (
-            sales_f.groupby(["Region","Store_ID"], as_index=False)
-            .agg(Revenue=("Sales_Revenue","sum"),
-                 Units=("Units_Sold","sum"),
-                 Footfall=("Footfall","sum"))
-            .sort_values("Revenue", ascending=False)
-        )
+        perf = store_perf(*filter_sig)
         st.dataframe(perf, use_container_width=True)
 
 # ------------- Sales Ops -------------
-with tab2:
+if active_tab == "Sales Ops":
     st.markdown("### Pricing vs Demand & Promotions Impact")
     cA, cB = st.columns(2)
 
@@ -201,23 +505,20 @@ with tab2:
         if sales_f.empty:
             st.info("No data to visualize.")
         else:
-            # Sample to keep plotting responsive
-            sample_df = sales_f.sample(min(2000, len(sales_f))) if len(sales_f) > 0 else sales_f
-            # Try with trendline; if statsmodels is missing, fallback without trendline
-            try:
-                fig = px.scatter(
-                    sample_df,
-                    x="Unit_Price", y="Units_Sold",
-                    color="SKU_Category",
-                    trendline="ols",
-                    title="Price vs Units Sold (Sample)"
-                )
-            except Exception:
-                fig = px.scatter(
-                    sample_df,
-                    x="Unit_Price", y="Units_Sold",
-                    color="SKU_Category",
-                    title="Price vs Units Sold (Sample)"
+            # Downsample to keep plotting responsive; WebGL handles the points
+            sample_df = price_units_sample(*filter_sig)
+            fig = px.scatter(
+                sample_df,
+                x="Unit_Price", y="Units_Sold",
+                color="SKU_Category",
+                render_mode="webgl",
+                title="Price vs Units Sold (Sample)"
+            )
+            for cat_name, (slope, intercept, x0, x1) in price_units_trend(*filter_sig).items():
+                xs = np.array([x0, x1])
+                fig.add_scatter(
+                    x=xs, y=slope * xs + intercept,
+                    mode="lines", name=f"{cat_name} trend", showlegend=False
                 )
             st.plotly_chart(fig, use_container_width=True)
 
@@ -225,8 +526,7 @@ with tab2:
         if sales_f.empty:
             st.empty()
         else:
-            promo = sales_f.groupby("Promo_Flag", as_index=False)["Sales_Revenue"].mean()
-            promo["Promo_Flag"] = promo["Promo_Flag"].map({0:"No Promo", 1:"Promo"}).fillna("Unknown")
+            promo = promo_impact(*filter_sig)
             st.plotly_chart(
                 px.bar(promo, x="Promo_Flag", y="Sales_Revenue", title="Average Revenue: Promo vs No Promo"),
                 use_container_width=True
@@ -236,16 +536,11 @@ with tab2:
     if sales_f.empty:
         st.info("No data for the selected filters.")
     else:
-        drivers = sales_f.groupby("SKU_Category", as_index=False).agg(
-            Avg_Footfall=("Footfall","mean"),
-            Avg_Staff=("Staff_Count","mean"),
-            Avg_Discount=("Discount","mean"),
-            Avg_CompetitorPrice=("Competitor_Price","mean")
-        ).round(2)
+        drivers = category_drivers(*filter_sig)
         st.dataframe(drivers, use_container_width=True)
 
 # ------------- Personas -------------
-with tab3:
+if active_tab == "Personas":
     st.markdown("### Persona Overview")
     if persona_f.empty:
         st.info("No persona data for the current filters.")
@@ -254,45 +549,55 @@ with tab3:
 
         c1, c2 = st.columns(2)
         with c1:
+            eng_counts = persona_bin_counts(tuple(loyalty_filter), "App_Engagement", "Loyalty_Segment")
             st.plotly_chart(
-                px.histogram(persona_f, x="App_Engagement", color="Loyalty_Segment",
-                             barmode="group", title="Engagement by Loyalty"),
+                px.bar(eng_counts, x="App_Engagement", y="Count", color="Loyalty_Segment",
+                       barmode="group", title="Engagement by Loyalty"),
                 use_container_width=True
             )
         with c2:
+            day_counts = persona_bin_counts(tuple(loyalty_filter), "Preferred_Visit_Day", "City")
             st.plotly_chart(
-                px.histogram(persona_f, x="Preferred_Visit_Day", color="City",
-                             barmode="group", title="Preferred Visit Days"),
+                px.bar(day_counts, x="Preferred_Visit_Day", y="Count", color="City",
+                       barmode="group", title="Preferred Visit Days"),
                 use_container_width=True
             )
 
         st.markdown("### High-Value Personas (Gold/Platinum)")
-        hv = persona_f[persona_f["Loyalty_Segment"].isin(["Gold","Platinum"])].copy()
+        hv = persona_f[persona_f["Loyalty_Segment"].isin(["Gold","Platinum"])]
         if hv.empty:
             st.info("No Gold/Platinum personas in current filters.")
         else:
-            # Simple value index for quick prioritization
-            hv["Value_Index"] = (
-                pd.to_numeric(hv["Avg_Spend_AED"], errors="coerce").fillna(0.0) *
-                (pd.to_numeric(hv["Visit_Frequency"], errors="coerce").fillna(0.0) +
-                 0.5 * pd.to_numeric(hv["Typical_Basket_Size"], errors="coerce").fillna(0.0))
-            )
+            # Simple value index for quick prioritization; the inputs are
+            # already float32 from load_data, so this is one array expression
+            hv = hv.assign(Value_Index=(
+                hv["Avg_Spend_AED"].to_numpy() *
+                (hv["Visit_Frequency"].to_numpy() + 0.5 * hv["Typical_Basket_Size"].to_numpy())
+            ))
             cols_show = ["Customer_ID","Name","City","Avg_Spend_AED",
                          "Visit_Frequency","Typical_Basket_Size",
                          "Category_Preference","App_Engagement","Value_Index"]
-            st.dataframe(hv.sort_values("Value_Index", ascending=False)[cols_show].head(20), use_container_width=True)
+            # O(M) top-K select + O(K log K) ordering instead of sorting
+            # every Gold/Platinum persona just to show 20 rows
+            vi = hv["Value_Index"].to_numpy()
+            k = min(20, vi.size)
+            top_idx = np.argpartition(-vi, k - 1)[:k]
+            top_idx = top_idx[np.argsort(-vi[top_idx])]
+            st.dataframe(hv.iloc[top_idx][cols_show], use_container_width=True)
 
 # ------------- Alerts & Actions -------------
-with tab4:
+if active_tab == "Alerts & Actions":
     st.markdown("### Algorithmic Alerts & Actionables")
     if sales_f.empty:
         st.info("No data to generate alerts.")
     else:
         # Restock: inventory below 60% of current demand
+        # Promo: underperformers (below q25 revenue) without promos
+        # Staffing: high footfall per staff threshold
         try:
-            restock = sales_f[sales_f["Stock_On_Hand"] < sales_f["Units_Sold"] * 0.6]
+            restock, promo_suggest, staffing = compute_alerts(*filter_sig)
         except Exception:
-            restock = pd.DataFrame()
+            restock = promo_suggest = staffing = pd.DataFrame()
 
         if restock.empty:
             st.success("No restock alerts. Inventory appears adequate for demand.")
@@ -304,14 +609,6 @@ with tab4:
                 use_container_width=True
             )
 
-        # Promo: underperformers without promos
-        try:
-            q25 = sales_f["Sales_Revenue"].quantile(0.25)
-            under_rev = sales_f["Sales_Revenue"] < q25
-            promo_suggest = sales_f[(sales_f["Promo_Flag"] == 0) & under_rev]
-        except Exception:
-            promo_suggest = pd.DataFrame()
-
         if promo_suggest.empty:
             st.success("No immediate promo suggestions.")
         else:
@@ -322,12 +619,6 @@ with tab4:
                 use_container_width=True
             )
 
-        # Staffing: high footfall per staff threshold
-        try:
-            staffing = sales_f[sales_f["Footfall"] / sales_f["Staff_Count"] > 50]
-        except Exception:
-            staffing = pd.DataFrame()
-
         if staffing.empty:
             st.success("Staffing levels appear adequate for current footfall.")
         else:
@@ -343,5 +634,23 @@ with tab4:
 # -----------------------------
 st.markdown("---")
 st.subheader("⬇️ Downloads")
-st.download_button("Download Filtered Sales CSV", sales_f.to_csv(index=False), file_name="filtered_sales.csv")
-st.download_button("Download Filtered Persona CSV", persona_f.to_csv(index=False), file_name="filtered_persona.csv")
+# Callables defer serialization until the button is actually clicked;
+# the cached byte helpers make the click itself a constant-time cache hit
+st.download_button(
+    "Download Filtered Sales CSV",
+    data=lambda: sales_csv_bytes(*filter_sig),
+    file_name="filtered_sales.csv",
+    mime="text/csv",
+)
+st.download_button(
+    "Download Filtered Persona CSV",
+    data=lambda: persona_csv_bytes(tuple(loyalty_filter)),
+    file_name="filtered_persona.csv",
+    mime="text/csv",
+)
+st.download_button(
+    "Download Revenue Trend CSV",
+    data=lambda: daily_revenue_csv_bytes(*filter_sig),
+    file_name="revenue_trend.csv",
+    mime="text/csv",
+)
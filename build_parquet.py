@@ -0,0 +1,27 @@
+# build_parquet.py
+"""One-time conversion of the source CSVs into Parquet mirrors.
+
+Run this after refreshing either CSV:
+
+    python build_parquet.py
+
+app.py prefers the .parquet files when they exist, which skips CSV
+tokenization on every cold start / container redeploy. The mirrors hold
+the same raw columns as the CSVs; all typing happens in the app's loader.
+"""
+import polars as pl
+
+CONVERSIONS = [
+    ("lulu_sales_ops.csv", "lulu_sales_ops.parquet"),
+    ("lulu_persona.csv", "lulu_persona.parquet"),
+]
+
+
+def main():
+    for src, dst in CONVERSIONS:
+        pl.read_csv(src).write_parquet(dst, compression="zstd", row_group_size=64000)
+        print(f"Wrote {dst}")
+
+
+if __name__ == "__main__":
+    main()